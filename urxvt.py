@@ -7,30 +7,73 @@ main one, selecting an icon and so on.
 Consult options below.
 """
 
-import argparse
+import collections
+import functools
+import json
 import os
 import subprocess
 import sys
 import logging
+import signal
+import types
 
 
-RUN_DAEMON = os.environ.get('URXVT_RUN_DAEMON', False)
-SIZE = os.environ.get('URXVT_SIZE', 14)
-ICON = os.environ.get('URXVT_ICON', '')
-ICON_PATH = os.environ.get('URXVT_ICON_PATH',
-                           os.path.expanduser('~/.urxvt/icons'))
-DEFAULT_FONT = os.environ.get('URXVT_TTF', '')
-DEFAULT_BITMAP = os.environ.get('URXVT_BMP', '')
-PERLEXT = os.environ.get('URXVT_PERL_EXT',
-                         "url-select,keyboard-select,font-size,color-themes")
 # Arbitrary added fonts, that provides symbols, icons, emoji (besides those
 # in default font)
 ADDITIONAL_FONTS = ['Noto Color Emoji', 'Symbola', 'Unifont Upper',
                     'DejaVu Sans']
 
+Config = collections.namedtuple('Config', ['run_daemon', 'size', 'icon',
+                                           'icon_path', 'default_font',
+                                           'default_bitmap', 'perl_ext',
+                                           'cache_file', 'font_paths',
+                                           'daemon_socket'])
+
 LOG = None
 
 
+@functools.cache
+def config():
+    """
+    Return configuration read from the environment (see README for the
+    variables). It is read on the first call, not on import, and reused
+    afterwards.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                os.path.expanduser('~/.cache'))
+    return Config(
+        run_daemon=os.environ.get('URXVT_RUN_DAEMON', False),
+        size=os.environ.get('URXVT_SIZE', 14),
+        icon=os.environ.get('URXVT_ICON', ''),
+        icon_path=os.environ.get('URXVT_ICON_PATH',
+                                 os.path.expanduser('~/.urxvt/icons')),
+        default_font=os.environ.get('URXVT_TTF', ''),
+        default_bitmap=os.environ.get('URXVT_BMP', ''),
+        perl_ext=os.environ.get('URXVT_PERL_EXT', "url-select,keyboard-"
+                                "select,font-size,color-themes"),
+        cache_file=os.environ.get('URXVT_CACHE_FILE',
+                                  os.path.join(cache_home, 'urxvt-wrapper',
+                                               'fonts.json')),
+        # Fontconfig configuration, font directories and fontconfig own
+        # caches, which are rewritten by fc-cache each time fonts are
+        # (un)installed; change of modification time of any of them
+        # invalidates the fonts cache
+        font_paths=(os.path.expanduser('~/.fonts.conf'),
+                    os.path.expanduser('~/.config/fontconfig'),
+                    '/etc/fonts',
+                    os.path.expanduser('~/.fonts'),
+                    os.path.expanduser('~/.local/share/fonts'),
+                    '/usr/share/fonts',
+                    '/usr/local/share/fonts',
+                    '/var/cache/fontconfig',
+                    os.path.join(cache_home, 'fontconfig')),
+        # Socket used by urxvtd and urxvtc, as described in urxvtd(1)
+        daemon_socket=os.environ.get('RXVT_SOCKET',
+                                     os.path.expanduser(
+                                         '~/.urxvt/urxvtd-%s' %
+                                         os.uname().nodename)))
+
+
 class Logger:
     """
     Simple logger class with output on console only
@@ -80,6 +123,117 @@ class Logger:
 LOG = Logger(__name__)()
 
 
+class Fontconfig:
+    """
+    Minimal ctypes binding to libfontconfig, which allows to list fonts
+    in-process instead of spawning fc-list and parsing its output.
+    """
+    _LIB = None
+    _CTYPES = None
+
+    @staticmethod
+    def available():
+        """
+        Return True if fontconfig library can be used. Library is loaded on
+        the first call only.
+        """
+        if Fontconfig._LIB is None:
+            Fontconfig._LIB = Fontconfig._load() or False
+        return bool(Fontconfig._LIB)
+
+    @staticmethod
+    def styles(family):
+        """
+        Yield list of styles for every font of provided family.
+        """
+        lib = Fontconfig._LIB
+        ctypes = Fontconfig._CTYPES
+
+        pattern = lib.FcPatternCreate()
+        objects = lib.FcObjectSetCreate()
+        fontset = None
+        try:
+            lib.FcPatternAddString(pattern, b'family', family.encode('utf-8'))
+            lib.FcObjectSetAdd(objects, b'style')
+            fontset = lib.FcFontList(None, pattern, objects)
+            if not fontset:
+                return
+
+            value = ctypes.c_char_p()
+            for idx in range(fontset.contents.nfont):
+                font = fontset.contents.fonts[idx]
+                styles = []
+                while lib.FcPatternGetString(font, b'style', len(styles),
+                                             ctypes.byref(value)) == 0:
+                    styles.append(value.value.decode('utf-8'))
+                yield styles
+        finally:
+            if fontset:
+                lib.FcFontSetDestroy(fontset)
+            lib.FcObjectSetDestroy(objects)
+            lib.FcPatternDestroy(pattern)
+
+    @staticmethod
+    def _load():
+        """
+        Load fontconfig library and declare used functions. Return None if
+        it's not possible.
+        """
+        try:
+            import ctypes
+            import ctypes.util
+        except ImportError as exc:
+            LOG.debug('Cannot use ctypes: %s', exc)
+            return None
+
+        try:
+            lib = ctypes.CDLL('libfontconfig.so.1')
+        except OSError:
+            # slow path, find_library may spawn external programs
+            name = ctypes.util.find_library('fontconfig')
+            if not name:
+                # CDLL(None) would load the main program instead
+                LOG.debug('Cannot find fontconfig library')
+                return None
+            try:
+                lib = ctypes.CDLL(name)
+            except OSError as exc:
+                LOG.debug('Cannot load fontconfig library: %s', exc)
+                return None
+
+        class FcFontSet(ctypes.Structure):
+            _fields_ = [('nfont', ctypes.c_int),
+                        ('sfont', ctypes.c_int),
+                        ('fonts', ctypes.POINTER(ctypes.c_void_p))]
+
+        ptr = ctypes.c_void_p
+        try:
+            lib.FcInit.restype = ctypes.c_int
+            lib.FcPatternCreate.restype = ptr
+            lib.FcPatternAddString.argtypes = [ptr, ctypes.c_char_p,
+                                               ctypes.c_char_p]
+            lib.FcPatternGetString.argtypes = [ptr, ctypes.c_char_p,
+                                               ctypes.c_int,
+                                               ctypes.POINTER(ctypes.c_char_p)]
+            lib.FcPatternDestroy.argtypes = [ptr]
+            lib.FcObjectSetCreate.restype = ptr
+            lib.FcObjectSetAdd.argtypes = [ptr, ctypes.c_char_p]
+            lib.FcObjectSetDestroy.argtypes = [ptr]
+            lib.FcFontList.restype = ctypes.POINTER(FcFontSet)
+            lib.FcFontList.argtypes = [ptr, ptr, ptr]
+            lib.FcFontSetDestroy.argtypes = [ctypes.POINTER(FcFontSet)]
+        except AttributeError as exc:
+            LOG.debug('Unusable fontconfig library: %s', exc)
+            return None
+
+        if not lib.FcInit():
+            LOG.debug('Cannot initialize fontconfig library')
+            return None
+
+        Fontconfig._CTYPES = ctypes
+        return lib
+
+
 class Font:
     """
     Represents font object, which can produce valid XFT strings for provided
@@ -88,22 +242,35 @@ class Font:
     xft:font name:style=somestyle:pixelsize=12
     """
 
-    XFT_TEMPLATE = 'xft:%s:style=%s:pixelsize=%d'
+    FC_LIST_FORMAT = '%{style}\n'
+    # maximum number of fc-list processes run at once
+    FC_LIST_JOBS = 4
 
     # TODO: do we need italic/bolditalic?
-    _REGULAR = ['regular', 'normal', 'book', 'medium']
-    _BOLD = ['bold']
-    _AVAILABLE_FONTS = {}
+    _REGULAR = ('regular', 'normal', 'book', 'medium')
+    _BOLD = ('bold',)
+    _STYLES = frozenset(_REGULAR + _BOLD)
+    _AVAILABLE_FONTS = None
+    _SIGNATURE = None
+    _OUTDATED = None
+    _INSTANCES = {}
 
     def __init__(self, name, size):
         self.size = size
         self.name = name
-        self._regular = None
-        self._bold = None
 
-        self._get_all_suitable_fonts()
+    @classmethod
+    def get(cls, name, size):
+        """
+        Return Font object for given name and size. Objects are shared, so
+        that xft strings for the same font are computed only once.
+        """
+        key = (name, size)
+        if key not in cls._INSTANCES:
+            cls._INSTANCES[key] = cls(name, size)
+        return cls._INSTANCES[key]
 
-    @property
+    @functools.cached_property
     def bold(self):
         """
         Return full string font to use for xft definition for urxvt, i.e.
@@ -112,19 +279,9 @@ class Font:
         It may happen, that a font doesn't provide bold face. Function will
         than return empty string.
         """
-        if self._bold is not None:
-            return self._bold
+        return self._get_xft('bold')
 
-        style = Font._AVAILABLE_FONTS['bold'].get(self.name)
-        if not style:
-            LOG.warning(f'Bold style not found for {self.name}')
-            self._bold = ''
-        else:
-            self._bold = Font.XFT_TEMPLATE % (self.name, style, self.size)
-
-        return self._bold
-
-    @property
+    @functools.cached_property
     def regular(self):
         """
         Return full string font to use for xft definition for urxvt, i.e.
@@ -138,103 +295,368 @@ class Font:
         placed as a last resort, and choice for particular font face is left
         to the user.
         """
-        if self._regular is not None:
-            return self._regular
+        return self._get_xft('regular')
 
-        style = Font._AVAILABLE_FONTS['regular'].get(self.name)
+    def _get_xft(self, kind):
+        """
+        Return xft string for the style of given kind (regular or bold), or
+        empty string, if font doesn't provide such style.
+        """
+        style = Font.lookup([self.name]).get((kind, self.name))
         if not style:
-            LOG.warning(f'Regular style not found for {self.name}')
-            self._regular = ''
-        else:
-            self._regular = Font.XFT_TEMPLATE % (self.name, style, self.size)
-
-        return self._regular
+            LOG.warning(f'{kind.capitalize()} style not found for {self.name}')
+            return ''
+        return Font._xft(self.name, style, self.size)
 
-    def _get_all_suitable_fonts(self):
+    @staticmethod
+    def _xft(name, style, size):
         """
-        Scan all available in the system fonts, where every line have format:
-
-        font_filename: font_name1[,font_name2,…]:style=style1[,style2,…]
-
-        Font can have several names and several styles. Styles can be either
-        single defined style or comma separated list of aliases or
-        internationalized names for style, i.e.:
+        Return xft string for given font name, style and size.
+        """
+        return f'xft:{name}:style={style}:pixelsize={size}'
 
-            filename1: font_name1:style=style
-            filename2: font_name2,font_name3:style=style1,style2
-            filename3: font_name4:style=style3,style4
+    @staticmethod
+    def lookup(names):
+        """
+        Make sure styles for provided font names are known and return
+        dictionary of fonts. It is a flat dictionary with the kind of style
+        (bold or regular) and font name as a key, and it have a format:
+
+            {('bold', 'font name'): 'Bold',
+             ('bold', 'font name3'): 'bold',
+             ('regular', 'font_name1'): 'Regular',
+             ('regular', 'font_name2'): 'Medium',
+             ('regular', 'font_name3'): 'Normal'}
+
+        Style which font doesn't provide is stored as an empty string, so
+        that fonts which are not installed are not looked up over and over
+        again.
+
+        Only the names which are not known yet are looked up. Fonts found
+        (or not found) this way are stored in the cache file and reused by
+        subsequent runs as long as none of the font paths (see config()) was
+        modified in the meantime.
+
+        Outdated cache is still used for this run, while it is refreshed by
+        the background process (see _refresh_cache()), so that the terminal
+        doesn't wait for fc-list after fonts were installed or removed. That
+        process also looks up the missing names, and is the only one which
+        writes the cache file.
+        """
+        fonts = Font._fonts()
+        # both kinds are always stored together, checking one is enough
+        missing = [name for name in dict.fromkeys(names)
+                   if name and ('regular', name) not in fonts]
+
+        if Font._OUTDATED is not None:
+            signature, Font._OUTDATED = Font._OUTDATED, None
+            known = {name for _, name in fonts}
+            if Font._refresh_cache(signature, known.union(missing)):
+                LOG.info('Refreshing outdated fonts cache in background')
+                # don't overwrite refreshed cache with outdated data
+                Font._SIGNATURE = None
+            else:
+                fonts.clear()
+                Font._SIGNATURE = signature
+                missing = [name for name in dict.fromkeys(names) if name]
+
+        if missing:
+            Font._update(fonts, missing)
+            if Font._SIGNATURE is not None:
+                Font._save_cache(Font._SIGNATURE, fonts)
+
+        return fonts
+
+    @staticmethod
+    def _fonts():
+        """
+        Return dictionary of fonts known so far. It is read from the cache
+        file on the first call, so that nothing is done until a style is
+        actually needed. If the cache is outdated, its new signature is kept
+        in _OUTDATED for lookup() to refresh it.
+        """
+        if Font._AVAILABLE_FONTS is not None:
+            return Font._AVAILABLE_FONTS
 
-        Information about fonts will be stored as a class variable
-        _AVAILABLE_FONTS within two dictionaries: bold and regular, stored in
-        corresponding keys in mentioned dict. _AVAILABLE_FONTS will have a
-        format:
+        signature = Font._get_signature()
+        fonts, cached_signature = Font._load_cache()
 
-            {'bold': {'font name': 'Bold',
-                      'font name3': 'bold'},
-             'regular': {'font_name1': 'Regular',
-                         'font_name2': 'Medium',
-                         'font_name3': 'Normal'}}
+        if fonts is not None and cached_signature != signature:
+            Font._OUTDATED = signature
 
-        As for regular/normal/book/medium styles, whatever style is available
-        for given font, it will be chosen, as ordered in _REGULAR list
-        whichever matches first.
+        Font._SIGNATURE = signature
+        Font._AVAILABLE_FONTS = fonts or {}
+        return Font._AVAILABLE_FONTS
 
-        Note, that fc-list and all the parsing is done once, per running this
-        script, regardless of font faces passed by -f option or those defined
-        in ADDITIONAL_FONTS.
+    @staticmethod
+    def _update(fonts, names):
         """
-        if Font._AVAILABLE_FONTS:
-            return
+        Look up provided font names and put their styles into fonts
+        dictionary, using empty string for missing ones.
 
-        regular = {}
-        bold = {}
+        Fontconfig library lookups are fast enough to be done one by one.
+        Without the library, each lookup waits for fc-list process, so
+        several of them are run concurrently.
+        """
+        if len(names) > 1 and not Fontconfig.available():
+            from concurrent import futures
+            jobs = min(len(names), Font.FC_LIST_JOBS)
+            with futures.ThreadPoolExecutor(jobs) as executor:
+                results = list(executor.map(Font._lookup, names))
+        else:
+            results = [Font._lookup(name) for name in names]
 
-        out = subprocess.check_output(['fc-list']).decode('utf-8')
-        out = sorted(out.split('\n'))  # let's have it in order
+        for name, (regular, bold) in zip(names, results):
+            fonts['regular', name] = regular or ''
+            fonts['bold', name] = bold or ''
 
-        for line in out:
-            if not line:
+    @staticmethod
+    def _refresh_cache(signature, names):
+        """
+        Look up provided font names again and write them to the cache file
+        with new signature in detached process. Return False, if such process
+        cannot be started.
+        """
+        try:
+            pid = os.fork()
+        except (AttributeError, OSError) as exc:
+            LOG.debug('Cannot refresh fonts cache in background: %s', exc)
+            return False
+
+        if pid:
+            os.waitpid(pid, 0)
+            return True
+
+        # Double fork, so that the process doing the work is detached from
+        # the terminal and doesn't become the child of urxvt, which replaces
+        # current process.
+        try:
+            os.setsid()
+            if os.fork():
+                os._exit(0)
+
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in range(3):
+                os.dup2(devnull, fd)
+
+            fonts = {}
+            Font._update(fonts, names)
+            Font._save_cache(signature, fonts)
+        finally:
+            os._exit(0)
+
+    @staticmethod
+    def _get_signature():
+        """
+        Return the latest modification time (in nanoseconds) of existing
+        font paths, which is used for validating the cache.
+        """
+        signature = 0
+        for path in config().font_paths:
+            try:
+                signature = max(signature, os.stat(path).st_mtime_ns)
+            except OSError:
                 continue
+        return signature
 
-            if ': ' not in line:
-                continue
+    @staticmethod
+    def _load_cache():
+        """
+        Read fonts dictionary and its signature from the cache file. Return
+        tuple of Nones if cache doesn't exist or is broken.
+        """
+        cache_file = config().cache_file
+        try:
+            with open(cache_file) as fobj:
+                data = json.load(fobj)
+            fonts = {(kind, name): style
+                     for kind, name, style in data['fonts']}
+            signature = data['signature']
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            LOG.debug('Cannot use fonts cache %s: %s', cache_file, exc)
+            return None, None
+
+        LOG.info('Using fonts cache %s', cache_file)
+        return fonts, signature
+
+    @staticmethod
+    def _save_cache(signature, fonts):
+        """
+        Write fonts dictionary to the cache file. File is replaced
+        atomically, so that concurrently started wrappers will never read
+        partial data.
+        JSON doesn't support tuples as keys, so fonts are stored as a list of
+        [kind, name, style] items.
+        """
+        data = {'signature': signature,
+                'fonts': [[kind, name, style]
+                          for (kind, name), style in fonts.items()]}
+        cache_file = config().cache_file
+        tmp = '%s.%d' % (cache_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(tmp, 'w') as fobj:
+                json.dump(data, fobj)
+            os.replace(tmp, cache_file)
+        except OSError as exc:
+            LOG.warning('Cannot write fonts cache %s: %s', cache_file, exc)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _lookup(name):
+        """
+        Look up the styles of given font family.
 
-            if ':style=' not in line:
-                continue
+        Return tuple of regular and bold style, any of them can be None if
+        font doesn't provide such style. As for regular/normal/book/medium
+        styles, the one which comes first in _REGULAR tuple is chosen,
+        regardless of the order in which fontconfig reports the fonts.
+
+        Querying fontconfig for particular families makes the output (and
+        parsing) proportional to the number of requested fonts, rather than
+        to the number of all the fonts installed in the system.
+        """
+        regular = None
+        regular_rank = len(Font._REGULAR)
+        bold = None
+        info = LOG.isEnabledFor(logging.INFO)
+        debug = LOG.isEnabledFor(logging.DEBUG)
 
-            line = line.split(': ')[1]
-            font_names = [n.strip() for n in line.split(':')[0].split(',')]
-            styles = [s.strip() for s in line.split(':style=')[1].split(',')]
+        for styles in Font._get_styles(name):
+            styles = list(map(str.strip, styles))
 
-            style = self._parse_style(styles)
+            style = Font._parse_style(styles)
             if not style:
-                LOG.debug('No suitable styles found for font in line: %s',
-                          line)
+                if debug:
+                    LOG.debug('No suitable styles found for font %s in: %s',
+                              name, ','.join(styles))
                 continue
 
-            for name in font_names:
-                if style.lower() == 'bold' and not bold.get(name):
+            is_bold = style.lower() == 'bold'
+            rank = None if is_bold else Font._REGULAR.index(style.lower())
+            if is_bold and not bold:
+                if info:
                     LOG.info('Adding bold font for name: %s', name)
-                    bold[name] = style
-                elif style.lower() != 'bold' and not regular.get(name):
+                bold = style
+            elif not is_bold and rank < regular_rank:
+                if info:
                     LOG.info('Adding regular font for name: %s', name)
-                    regular[name] = style
-                else:
-                    LOG.debug('Font %s probably already exists in dict', name)
+                regular = style
+                regular_rank = rank
+            elif debug:
+                LOG.debug('Font %s already have style %s', name, style)
 
-        Font._AVAILABLE_FONTS = {'regular': regular, 'bold': bold}
+            if bold and regular_rank == 0:
+                # nothing better to find, don't read the rest of the output
+                break
+
+        return regular, bold
+
+    @staticmethod
+    def _get_styles(name):
+        """
+        Yield list of styles for every font file of given family. Styles can
+        be either single defined style or aliases or internationalized names
+        for style, i.e.:
+
+            ['style1']
+            ['style2', 'style3']
+
+        Fontconfig library is used, if it can be loaded, otherwise fc-list
+        is asked for the fonts of the given family, each reported in a
+        separate line with comma separated list of styles.
+        """
+        if Fontconfig.available():
+            yield from Fontconfig.styles(name)
+            return
+
+        # escape characters special for fontconfig patterns
+        family = ''.join('\\' + char if char in '\\:,-' else char
+                         for char in name)
+        # options go before the pattern, fc-list can't be relied on to
+        # permute them
+        for line in Font._fc_list('-f', Font.FC_LIST_FORMAT,
+                                  ':family=' + family):
+            yield line.split(',')
+
+    @staticmethod
+    def _fc_list(*args):
+        """
+        Run fc-list with provided arguments and yield its output line by
+        line, as it is produced, so that there is no need for keeping whole
+        (potentially huge) output in memory. If caller stops iterating early,
+        fc-list is terminated.
+
+        fc-list is started with posix_spawn and its output is read from a
+        plain pipe, which avoids all the bookkeeping subprocess.Popen does
+        for each process. Popen is used where posix_spawn is not available.
+        """
+        command = ['fc-list']
+        command.extend(args)
+
+        if not hasattr(os, 'posix_spawnp'):
+            with subprocess.Popen(command, stdout=subprocess.PIPE,
+                                  encoding='utf-8') as proc:
+                try:
+                    for line in proc.stdout:
+                        yield line.rstrip('\n')
+                except GeneratorExit:
+                    proc.terminate()
+                    raise
+
+            if proc.returncode:
+                raise subprocess.CalledProcessError(proc.returncode, command)
+            return
+
+        read_fd, write_fd = os.pipe()
+        try:
+            pid = os.posix_spawnp(command[0], command, os.environ,
+                                  file_actions=[(os.POSIX_SPAWN_DUP2,
+                                                 write_fd, 1)])
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        try:
+            with open(read_fd, encoding='utf-8') as fobj:
+                for line in fobj:
+                    yield line.rstrip('\n')
+        except GeneratorExit:
+            os.kill(pid, signal.SIGTERM)
+            raise
+        finally:
+            _, status = os.waitpid(pid, 0)
+
+        returncode = os.waitstatus_to_exitcode(status)
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, command)
+
+    @staticmethod
+    def _parse_style(styles):
+        """
+        Return first style from the styles list, which matches (case
+        insensitive) one of the _REGULAR styles in order, or bold style
+        otherwise. Return None if there is no such style.
+        """
+        lowered = {}
+        for style in styles:
+            low = style.lower()
+            if low in Font._STYLES:
+                lowered.setdefault(low, style)
+
+        if not lowered:
+            return None
 
-    def _parse_style(self, styles):
         for reg_style in Font._REGULAR:
-            if reg_style in ''.join(styles).lower():
-                for style in styles:
-                    if style.lower() == reg_style:
-                        return style
+            if reg_style in lowered:
+                return lowered[reg_style]
 
-        if 'bold' in ''.join(styles).lower():
-            for style in styles:
-                if style.lower() == 'bold':
-                    return style
+        return lowered.get('bold')
 
 
 class Urxvt:
@@ -249,13 +671,15 @@ class Urxvt:
         self.perl_extensions = None
 
         self._bitmap = args.bitmap
-        self._icon_path = ICON_PATH
+        self._icon_path = config().icon_path
+        self._icon_file = None
         self._exec = args.execute
         self._rxvt_args = None
-        self._run_daemon = args.run_daemon or RUN_DAEMON
+        self._fn_arg = None
+        self._fb_arg = None
+        self._run_daemon = args.run_daemon or config().run_daemon
 
         self._setup(args)
-        self._validate()
 
     def run(self):
         """Run terminal emulator"""
@@ -267,56 +691,91 @@ class Urxvt:
             self._run_urxvt(args)
 
     def _run_client_server(self, args):
-        """Utilize urxvt client/daemon mode"""
+        """
+        Utilize urxvt client/daemon mode. If daemon socket doesn't exist,
+        daemon is started right away, instead of trying the client first.
+        The final client invocation replaces the wrapper process.
+        """
         command = ['urxvtc']
         command.extend(args)
-        process = subprocess.run(command)
 
-        if process.returncode == 2:
-            subprocess.run(['urxvtd', '-q', '-o', '-f'])
-            subprocess.run(command)
+        # urxvtc exits with 2 if it cannot connect, i.e. socket is stale
+        if (os.path.exists(config().daemon_socket) and
+                self._spawn(command) != 2):
+            return
+
+        self._spawn(['urxvtd', '-q', '-o', '-f'])
+        self._execvp(command)
+
+    @staticmethod
+    def _spawn(command):
+        """
+        Run command, wait for it to finish and return its exit code. Prefer
+        posix_spawn, which doesn't need to copy the memory mappings of the
+        Python process, over fork/exec done by subprocess.
+        """
+        if not hasattr(os, 'posix_spawnp'):
+            return subprocess.run(command).returncode
+
+        pid = os.posix_spawnp(command[0], command, os.environ)
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status)
 
     def _run_urxvt(self, args):
-        """Simply pass args to urxvt executable."""
+        """
+        Simply pass args to urxvt executable.
+        """
         command = ['urxvt']
         command.extend(args)
-        # LOG.info('%s', command)
-        subprocess.run(command)
+        self._execvp(command)
+
+    @staticmethod
+    def _execvp(command):
+        """
+        Replace wrapper process with the command, so there is no Python
+        interpreter waiting for the terminal to exit.
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            os.execvp(command[0], command)
+        except OSError as exc:
+            # report it regardless of verbosity, wrapper can't do anything
+            # useful without the terminal
+            LOG.critical('Cannot execute %s: %s', command[0], exc)
+            sys.exit(1)
 
     def _setup(self, args):
         # it could be a list or a single font, it will be combined with
         # additional fonts
         self.fonts = self._parse_fonts(args.default_font)
+        self._fn_arg, self._fb_arg = self._make_font_args()
 
         if args.no_perl:
             self.perl_extensions = ''
         else:
-            self.perl_extensions = PERLEXT
+            self.perl_extensions = config().perl_ext
             if args.tabbedalt:
-                self.perl_extensions = 'tabbedalt,' + PERLEXT
+                self.perl_extensions = 'tabbedalt,' + config().perl_ext
 
         if args.rxvt_args:
             self._rxvt_args = args.rxvt_args
 
-    def _validate(self):
-        # validate fonts
-        for font in self.fonts:
-            if not any((font.regular, font.bold)):
-                LOG.error('Font %s seems to be unusable or nonexistent.',
-                          font.name)
+        if self.icon:
+            icon_file = os.path.join(self._icon_path, self.icon)
+            if os.path.exists(icon_file):
+                self._icon_file = icon_file
 
     def _make_command_args(self):
         args = []
 
         args.extend(['-pe', self.perl_extensions])
-        regular = ','.join([f.regular for f in self.fonts if f.regular])
-        if regular:
-            args.extend(['-fn', regular])
-        bold = ','.join([f.bold for f in self.fonts if f.bold])
-        if bold:
-            args.extend(['-fb', bold])
-        if self.icon and os.path.exists(os.path.join(ICON_PATH, self.icon)):
-            args.extend(['-icon', os.path.join(ICON_PATH, self.icon)])
+        if self._fn_arg:
+            args.extend(['-fn', self._fn_arg])
+        if self._fb_arg:
+            args.extend(['-fb', self._fb_arg])
+        if self._icon_file:
+            args.extend(['-icon', self._icon_file])
 
         if self._exec:
             args.extend(['-e', self._exec])
@@ -326,30 +785,111 @@ class Urxvt:
 
         return args
 
+    def _make_font_args(self):
+        """
+        Return comma separated xft strings for regular and bold fonts,
+        collected in a single pass over the fonts.
+        """
+        regular = []
+        bold = []
+        for font in self.fonts:
+            if font.regular:
+                regular.append(font.regular)
+            if font.bold:
+                bold.append(font.bold)
+        return ','.join(regular), ','.join(bold)
+
     def _parse_fonts(self, font_string):
         """
         Parse potentially provided font list, add additional fonts to it,
         adjust for possible bitmap font and return a list of Font objects.
+        Fonts which provide neither regular nor bold style are skipped.
         """
-        # get the copy of additional fonts
-        font_faces = ADDITIONAL_FONTS[:]
+        font_faces = [config().default_bitmap] if self._bitmap else []
+
+        # main font/fonts passed by commandline/env/default goes first,
+        # followed by additional fonts
+        font_faces.extend(f.strip() for f in font_string.split(','))
+        font_faces.extend(ADDITIONAL_FONTS)
+
+        # font might be listed several times, i.e. passed by -f and also
+        # present in ADDITIONAL_FONTS, keep only the first occurrence. Empty
+        # names (unset bitmap font or default font, stray commas) are dropped
+        font_faces = [f for f in dict.fromkeys(font_faces) if f]
+
+        # look up all the faces at once, and don't bother creating Font
+        # objects for those which are not installed
+        fonts = Font.lookup(font_faces)
+        usable = []
+        for face in font_faces:
+            if fonts.get(('regular', face)) or fonts.get(('bold', face)):
+                usable.append(face)
+            else:
+                LOG.error('Font %s seems to be unusable or nonexistent.',
+                          face)
 
-        # find out main font/fonts passed by commandline/env/default
-        if ',' in font_string:
-            f_f = [f.strip() for f in font_string.split(',')]
-            f_f.extend(font_faces)
-            font_faces = f_f
+        # return list of Font objects
+        return [Font.get(f, self.size) for f in usable]
+
+
+def _parse_args(argv):
+    """
+    Parse the most common command lines (switches and options with plain
+    values) without argparse, which import and setup takes considerable
+    part of the wrapper startup. Anything else, including help request or
+    invalid arguments, is passed to _slow_parse().
+    """
+    switches = {'-b': ('bitmap', True),
+                '--bitmap': ('bitmap', True),
+                '-d': ('run_daemon', False),
+                '--run-daemon': ('run_daemon', False),
+                '-n': ('no_perl', True),
+                '--no-perl': ('no_perl', True),
+                '-t': ('tabbedalt', True),
+                '--tabbedalt': ('tabbedalt', True)}
+    options = {'-e': 'execute', '--execute': 'execute',
+               '-f': 'default_font', '--default-font': 'default_font',
+               '-i': 'icon', '--icon': 'icon',
+               '-s': 'size', '--size': 'size'}
+
+    conf = config()
+    args = types.SimpleNamespace(bitmap=False, run_daemon=True,
+                                 execute=None, default_font=conf.default_font,
+                                 icon=conf.icon, no_perl=False, size=conf.size,
+                                 tabbedalt=False, verbose=0, rxvt_args=[])
+    remaining = list(argv)
+    while remaining:
+        arg = remaining.pop(0)
+        if arg == '--':
+            args.rxvt_args = remaining
+            break
+        if arg in switches:
+            setattr(args, *switches[arg])
+        elif arg == '--verbose':
+            args.verbose += 1
+        elif len(arg) > 1 and arg.strip('v') == '-':
+            args.verbose += len(arg) - 1
+        elif (arg in options and remaining and
+              not remaining[0].startswith('-')):
+            setattr(args, options[arg], remaining.pop(0))
         else:
-            font_faces.insert(0, font_string)
+            return _slow_parse(argv)
 
-        if self._bitmap:
-            font_faces.insert(0, DEFAULT_BITMAP)
+    try:
+        args.size = int(args.size)
+    except ValueError:
+        return _slow_parse(argv)
 
-        # return list of Font objects
-        return [Font(f, self.size) for f in font_faces]
+    return args
 
 
-def main():
+def _slow_parse(argv):
+    """
+    Parse command line arguments using argparse.
+    """
+    import argparse
+
+    conf = config()
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('-b', '--bitmap', action='store_true', help='use '
                         'bitmap font prior to scalable defined above')
@@ -357,23 +897,28 @@ def main():
                         help='run urxvt in client-server mode')
     parser.add_argument('-e', '--execute', default=None,
                         help='pass exec to urxvt')
-    parser.add_argument('-f', '--default-font', default=DEFAULT_FONT,
+    parser.add_argument('-f', '--default-font', default=conf.default_font,
                         help='use particular (comma separated) font face(s) '
                         'as default(s) one, should be provided by font name, '
-                        'not file name(s), default is "%s"' % DEFAULT_FONT)
-    parser.add_argument('-i', '--icon', default=ICON, help='select icon from '
-                        '%s."' % ICON_PATH)
+                        'not file name(s), default is "%s"' %
+                        conf.default_font)
+    parser.add_argument('-i', '--icon', default=conf.icon, help='select icon '
+                        'from %s."' % conf.icon_path)
     parser.add_argument('-n', '--no-perl', action='store_true',
                         help='no perl extensions')
-    parser.add_argument('-s', '--size', default=SIZE, type=int,
-                        help='set scalable forn size, default %s' % SIZE)
+    parser.add_argument('-s', '--size', default=conf.size, type=int,
+                        help='set scalable forn size, default %s' % conf.size)
     parser.add_argument('-t', '--tabbedalt', action='store_true',
                         help='activate tabbedalt extension')
     parser.add_argument("-v", "--verbose", help='be verbose. Adding more "v" '
                         'will increase verbosity', action="count", default=0)
     parser.add_argument("rxvt_args", nargs='*')
 
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def main():
+    args = _parse_args(sys.argv[1:])
 
     LOG.set_verbose(args.verbose)
 